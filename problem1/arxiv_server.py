@@ -1,10 +1,9 @@
 import sys, os,json,re
-import datetime
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import urllib.parse
+from paper_index import PaperIndex
+from corpus_stats import CorpusStats, time_now
 
-def time_now():
-    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds').replace('+00:00','Z')
 def log_line(path, status, extra=""):
     ts= time_now()
     phrase= {200:"OK", 400:"Bad Request", 404:"Not Found", 500:"Internal Server Error"}.get(status, "")
@@ -33,28 +32,91 @@ def load_files(path):
 
 paper= 'sample_data/papers.json'
 corpus= 'sample_data/corpus_analysis.json'
+index= 'sample_data/papers.idx' # built by paper_index.py
 
-papers= load_files(paper)
+def load_index(path, source):
+    # mapped bundle if present and at least as new as papers.json, else None and the JSON is parsed
+    pa= os.path.abspath(path)
+    if not os.path.exists(pa):
+        return None
+    try:
+        if os.path.exists(source) and os.path.getmtime(pa) < os.path.getmtime(source):
+            log.append(f"WARNING index older than {os.path.abspath(source)}, ignoring {pa}")
+            return None
+        return PaperIndex(pa)
+    except (OSError, ValueError) as e:
+        log.append(f"WARNING unusable index ({pa}): {e}")
+        return None
+
+bundle= load_index(index, paper)
+papers= None if bundle else load_files(paper)
 corpuses= load_files(corpus)
 
 if log:
     print("\n".join(f"[{time_now()}] {m}" for m in log), file=sys.stderr)
 
-if corpuses and isinstance(corpuses, dict) and "top_50_words" in corpuses:
-    corpuses['top_10_words'] = (corpuses.pop('top_50_words', [])[:10])
 papers= papers   if isinstance(papers, list) else []
 corpuses= corpuses if isinstance(corpuses, dict) else {}
+## stats are counted once at load and kept as running counters; a mapped index carries its own
+## counters, read on the first /stats so startup stays cheap
+stats= None if bundle else CorpusStats.build(p for p in papers if isinstance(p, dict))
+
+def stats_body():
+    global stats
+    if stats is None:
+        stats= bundle.stats()
+    out= {"query": corpuses["query"]} if "query" in corpuses else {} # how papers.json was fetched
+    out.update(stats.snapshot(10))
+    return out
 
 idd= {p.get("arxiv_id"): p for p in papers if p.get("arxiv_id")}
 paper_path= {f"/papers/{urllib.parse.quote(pid)}" for pid in idd.keys()}
 
+def paper_list():
+    if bundle:
+        return bundle.list_body(), bundle.n_docs
+    out=[]
+    for p in papers:
+        out.append({
+            "arxiv_id": p.get("arxiv_id"),
+            "title": p.get("title"),
+            "authors": p.get("authors", []),
+            "categories": p.get("categories",[])
+        })
+    return json.dumps(out).encode('utf-8'), len(out)
+
+def paper_body(path):
+    if bundle:
+        if not path.startswith("/papers/"):
+            return None
+        return bundle.record(urllib.parse.unquote(path.split("/papers/",1)[1]))
+    if path not in paper_path:
+        return None
+    p= idd.get(urllib.parse.unquote(path.split("/papers/",1)[1]))
+    return None if p is None else json.dumps(p).encode('utf-8')
+
+def search_hits(terms):
+    # (arxiv_id, title, title score, abstract score) for papers containing every term
+    if bundle:
+        return bundle.search(terms)
+    hits= []
+    for p in (papers or []):
+        t= (p.get("title","") or "").lower()
+        a= (p.get("abstract","") or "").lower()
+        if not all(term in t or term in a for term in terms):
+            continue
+        hits.append((p.get("arxiv_id"), p.get("title"), sum(t.count(w) for w in terms), sum(a.count(w) for w in terms)))
+    return hits
+
 server_class= HTTPServer
 handler_class= BaseHTTPRequestHandler
 
 class ArxivHandler(BaseHTTPRequestHandler): ##must be subclass
 
     def json_response(self,status,data):
-        response = json.dumps(data).encode('utf-8')
+        self.raw_response(status, json.dumps(data).encode('utf-8'))
+
+    def raw_response(self,status,response):
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Content-Length', str(len(response)))
@@ -70,28 +132,16 @@ class ArxivHandler(BaseHTTPRequestHandler): ##must be subclass
         try:
             parsed_path= urllib.parse.urlparse(self.path)
             if parsed_path.path == '/papers':
-                out=[]
-                for p in papers:
-                    out.append({
-                        "arxiv_id": p.get("arxiv_id"),
-                        "title": p.get("title"),
-                        "authors": p.get("authors", []),
-                        "categories": p.get("categories",[])
-                    })
-                self.json_response(200, out)
-                log_line(self.path, 200, f"returned {len(out)} papers") ## num res
+                body, n= paper_list()
+                self.raw_response(200, body)
+                log_line(self.path, 200, f"returned {n} papers") ## num res
                 return
-            elif parsed_path.path in paper_path:
-                pid= urllib.parse.unquote(parsed_path.path.split("/papers/",1)[1])
-                paper= idd.get(pid)
-                if paper is not None:
-                    self.json_response(200, paper)
+            elif parsed_path.path.startswith('/papers/'):
+                body= paper_body(parsed_path.path)
+                if body is not None:
+                    self.raw_response(200, body)
                     log_line(self.path, 200)
                     return
-                else:
-                    self.json_response(404, self.err("Paper not found"))
-                    log_line(self.path, 404)
-                return
             elif parsed_path.path == '/search':
                 qs= urllib.parse.parse_qs(parsed_path.query)
                 q= (qs.get('q', [''])[0]or"").strip()
@@ -105,19 +155,13 @@ class ArxivHandler(BaseHTTPRequestHandler): ##must be subclass
                     log_line(self.path, 400)
                     return
                 results= []
-                for p in (papers or []):
-                    t= (p.get("title","") or "").lower()
-                    a= (p.get("abstract","") or "").lower()
-                    if not all(term in t or term in a for term in terms):
-                        continue
-                    s_title= sum(t.count(w) for w in terms)
-                    s_abs= sum(a.count(w) for w in terms)
+                for pid, title, s_title, s_abs in search_hits(terms):
                     score= s_title + s_abs
                     if score > 0:
                         w= ([] if s_title==0 else ["title"]) + ([] if s_abs==0 else ["abstract"])
                         results.append({
-                            "arxiv_id": p.get("arxiv_id"),
-                            "title": p.get("title"),
+                            "arxiv_id": pid,
+                            "title": title,
                             "match_score": int(score),
                             "matches_in": w
                         })
@@ -128,7 +172,7 @@ class ArxivHandler(BaseHTTPRequestHandler): ##must be subclass
                 log_line(self.path, 200, f"{len(payload['results'])} results")
                 return
             elif parsed_path.path == '/stats':
-                self.json_response(200, corpuses)
+                self.json_response(200, stats_body())
                 log_line(self.path, 200)
                 return
             self.json_response(404, self.err("Not found"))
@@ -0,0 +1,110 @@
+import datetime, heapq
+from collections import Counter
+
+## corpus statistics for /stats, same rules as the offline corpus_analysis.json:
+## whitespace words, lowercased for counting, stopwords left out of the word rankings
+
+STOPWORDS= {
+    'the','a','an','and','or','but','in','on','at','to','for','of','with','by','from','up','about','into',
+    'through','during','is','are','was','were','be','been','being','have','has','had','do','does','did',
+    'will','would','could','should','may','might','can','this','that','these','those','i','you','he','she',
+    'it','we','they','what','which','who','when','where','why','how','all','each','every','both','few',
+    'more','most','other','some','such','as','also','very','too','only','so','than','not'
+}
+BUCKET= 50 # words per abstract length bucket
+
+def time_now():
+    # shared with arxiv_server, which imports it from here
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds').replace('+00:00','Z')
+
+class CorpusStats:
+    # running counters; add() costs one pass over a paper's abstract and /stats only re-ranks the words
+    def __init__(self):
+        self.n= 0
+        self.total_words= 0
+        self.longest= None
+        self.shortest= None
+        self.lengths= Counter()
+        self.freq= Counter()
+        self.docs= Counter()
+        self.categories= Counter()
+        self.terms= {"uppercase_terms": {}, "numeric_terms": {}, "hyphenated_terms": {}} # dicts keep first-seen order
+        self.updated= None
+        self._snap= {}
+
+    @classmethod
+    def build(cls, papers):
+        st= cls()
+        for p in papers:
+            st.add(p)
+        return st
+
+    def add(self, paper):
+        words= (paper.get("abstract","") or "").split()
+        n= len(words)
+        self.n+= 1
+        self.total_words+= n
+        self.longest= n if self.longest is None else max(self.longest, n)
+        self.shortest= n if self.shortest is None else min(self.shortest, n)
+        self.lengths[n // BUCKET]+= 1
+        kept= [w.lower() for w in words]
+        kept= [w for w in kept if w not in STOPWORDS]
+        self.freq.update(kept)
+        self.docs.update(set(kept))
+        for w in words:
+            if any(c.isupper() for c in w):
+                self.terms["uppercase_terms"][w]= None
+            if any(c.isdigit() for c in w):
+                self.terms["numeric_terms"][w]= None
+            if "-" in w:
+                self.terms["hyphenated_terms"][w]= None
+        self.categories.update(paper.get("categories",[]) or [])
+        self.updated= time_now()
+        self._snap= {}
+
+    def top(self, k):
+        # k most frequent words, ties alphabetical; a k-sized heap instead of sorting every word
+        best= heapq.nsmallest(k, self.freq.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [{"word": w, "frequency": f, "documents": self.docs[w]} for w,f in best]
+
+    def snapshot(self, k=10):
+        if k in self._snap:
+            return self._snap[k]
+        out= {
+            "papers_processed": self.n,
+            "processing_timestamp": self.updated,
+            "corpus_stats": {
+                "total_abstracts": self.n,
+                "total_words": self.total_words,
+                "unique_words_global": len(self.freq),
+                "avg_abstract_length": self.total_words / self.n if self.n else 0,
+                "longest_abstract_words": self.longest or 0,
+                "shortest_abstract_words": self.shortest or 0,
+                "abstract_length_distribution": {
+                    f"{b * BUCKET}-{b * BUCKET + BUCKET - 1}": c for b,c in sorted(self.lengths.items())
+                }
+            },
+            "technical_terms": {k2: sorted(v) for k2,v in self.terms.items()},
+            "category_distribution": dict(self.categories.most_common()),
+            f"top_{k}_words": self.top(k)
+        }
+        self._snap[k]= out
+        return out
+
+    def state(self):
+        return {
+            "n": self.n, "total_words": self.total_words, "longest": self.longest, "shortest": self.shortest,
+            "lengths": {str(b): c for b,c in self.lengths.items()},
+            "freq": dict(self.freq), "docs": dict(self.docs), "categories": dict(self.categories),
+            "terms": {k: list(v) for k,v in self.terms.items()}, "updated": self.updated
+        }
+
+    @classmethod
+    def from_state(cls, d):
+        st= cls()
+        st.n, st.total_words, st.longest, st.shortest= d["n"], d["total_words"], d["longest"], d["shortest"]
+        st.lengths= Counter({int(b): c for b,c in d["lengths"].items()})
+        st.freq, st.docs, st.categories= Counter(d["freq"]), Counter(d["docs"]), Counter(d["categories"])
+        st.terms= {k: dict.fromkeys(v) for k,v in d["terms"].items()}
+        st.updated= d["updated"]
+        return st
@@ -0,0 +1,213 @@
+import sys, os, json, re, struct, mmap
+from bisect import bisect_right
+from corpus_stats import CorpusStats
+
+## binary bundle compiled from papers.json (python paper_index.py papers.json papers.idx)
+## the server maps it read-only, so replicas on one host share the page cache
+##
+## layout, little endian:
+##   header   magic, version, n_docs, n_tokens, then (offset, length) for each section
+##   LIST     body of GET /papers, pre-serialized
+##   RECORDS  body of GET /papers/{id} for each paper, concatenated
+##   DOCS     per paper: record offset/len, meta offset/len   (<QIQI)
+##   META     per paper: json [arxiv_id, title]
+##   IDS      arxiv ids, concatenated
+##   IDTAB    sorted by id: id offset/len, paper number       (<QII)
+##   TOKENS   sorted tokens, each followed by "\n"
+##   TOKSTART start of each token in TOKENS                   (<I)
+##   TOKTAB   per token: postings offset, count              (<QI)
+##   POSTINGS per token: paper number, title tf, abstract tf  (<III)
+##   STATS    json CorpusStats.state() for /stats
+
+MAGIC= b"ARXIVIDX"
+VERSION= 2
+SECTIONS= ["LIST","RECORDS","DOCS","META","IDS","IDTAB","TOKENS","TOKSTART","TOKTAB","POSTINGS","STATS"]
+HEADER= struct.Struct(f"<8sIII{2 * len(SECTIONS)}Q")
+DOC= struct.Struct("<QIQI")
+IDENT= struct.Struct("<QII")
+TOK= struct.Struct("<QI")
+POST= struct.Struct("<III")
+
+def tokens(text):
+    # same characters the server's search accepts, so substring counts can be summed per token
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+def summary(p):
+    return {
+        "arxiv_id": p.get("arxiv_id"),
+        "title": p.get("title"),
+        "authors": p.get("authors", []),
+        "categories": p.get("categories",[])
+    }
+
+def build(papers, out_path):
+    papers= [p for p in papers if isinstance(p, dict)]
+    sec= {}
+    sec["LIST"]= json.dumps([summary(p) for p in papers]).encode("utf-8")
+
+    records, meta, docs= bytearray(), bytearray(), bytearray()
+    postings= {}
+    stats= CorpusStats()
+    for i,p in enumerate(papers):
+        stats.add(p)
+        rec= json.dumps(p).encode("utf-8")
+        m= json.dumps([p.get("arxiv_id"), p.get("title")]).encode("utf-8")
+        docs+= DOC.pack(len(records), len(rec), len(meta), len(m))
+        records+= rec
+        meta+= m
+        tf= {}
+        for field,text in ((0, p.get("title","")), (1, p.get("abstract",""))):
+            for tok in tokens(text):
+                tf.setdefault(tok, [0, 0])[field]+= 1
+        for tok,(t,a) in tf.items():
+            postings.setdefault(tok, []).append((i, t, a))
+    sec["RECORDS"], sec["META"], sec["DOCS"]= bytes(records), bytes(meta), bytes(docs)
+    sec["STATS"]= json.dumps(stats.state()).encode("utf-8")
+
+    # only papers the server can route to get an id entry; a repeated id keeps its last paper like the old dict
+    last= {}
+    for i,p in enumerate(papers):
+        pid= p.get("arxiv_id")
+        if pid:
+            last[pid]= i
+    ids, idtab= bytearray(), []
+    for pid,i in last.items():
+        b= pid.encode("utf-8")
+        idtab.append((b, len(ids), i))
+        ids+= b
+    idtab.sort()
+    sec["IDS"]= bytes(ids)
+    sec["IDTAB"]= b"".join(IDENT.pack(off, len(b), i) for b,off,i in idtab)
+
+    toks= sorted(postings)
+    blob, starts, toktab, post= bytearray(), bytearray(), bytearray(), bytearray()
+    for tok in toks:
+        starts+= struct.pack("<I", len(blob))
+        blob+= tok.encode("ascii") + b"\n"
+        toktab+= TOK.pack(len(post), len(postings[tok]))
+        for entry in postings[tok]:
+            post+= POST.pack(*entry)
+    sec["TOKENS"], sec["TOKSTART"], sec["TOKTAB"], sec["POSTINGS"]= bytes(blob), bytes(starts), bytes(toktab), bytes(post)
+
+    # sections are 8-byte aligned so the integer tables can be cast in place
+    offs= []
+    pos= HEADER.size
+    for name in SECTIONS:
+        pos+= -pos % 8
+        offs+= [pos, len(sec[name])]
+        pos+= len(sec[name])
+    tmp= out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(papers), len(toks), *offs))
+        for name in SECTIONS:
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(sec[name])
+    os.replace(tmp, out_path)
+    return len(papers), len(toks)
+
+
+class PaperIndex:
+    def __init__(self, path):
+        if sys.byteorder != "little":
+            raise ValueError("paper index needs a little endian host")
+        with open(path, "rb") as f:
+            self.mm= mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        head= HEADER.unpack_from(self.mm, 0)
+        if head[0] != MAGIC or head[1] != VERSION:
+            raise ValueError(f"not a version {VERSION} paper index: {path}")
+        self.n_docs, self.n_tokens= head[2], head[3]
+        view= memoryview(self.mm)
+        self.sec= {}
+        for k,name in enumerate(SECTIONS):
+            off, ln= head[4 + 2 * k], head[5 + 2 * k]
+            self.sec[name]= view[off:off + ln]
+            if name == "TOKENS":
+                self.tok_off, self.tok_end= off, off + ln
+        self.tok_starts= self.sec["TOKSTART"].cast("I")
+        self.term_cache= {}
+
+    def list_body(self):
+        return self.sec["LIST"]
+
+    def stats(self):
+        return CorpusStats.from_state(json.loads(bytes(self.sec["STATS"])))
+
+    def _meta(self, i):
+        _, _, moff, mlen= DOC.unpack_from(self.sec["DOCS"], i * DOC.size)
+        return json.loads(bytes(self.sec["META"][moff:moff + mlen]))
+
+    def record(self, pid):
+        # binary search over the sorted id table, comparing raw utf-8 bytes
+        key= pid.encode("utf-8")
+        ids, tab= self.sec["IDS"], self.sec["IDTAB"]
+        lo, hi= 0, len(tab) // IDENT.size
+        while lo < hi:
+            mid= (lo + hi) // 2
+            off, ln, i= IDENT.unpack_from(tab, mid * IDENT.size)
+            cur= bytes(ids[off:off + ln])
+            if cur == key:
+                roff, rlen, _, _= DOC.unpack_from(self.sec["DOCS"], i * DOC.size)
+                return self.sec["RECORDS"][roff:roff + rlen]
+            if cur < key:
+                lo= mid + 1
+            else:
+                hi= mid
+        return None
+
+    def _matching_tokens(self, term):
+        # every dictionary token containing term; tokens hold no "\n" so a hit never spans two
+        hits= self.term_cache.get(term)
+        if hits is not None:
+            return hits
+        hits= []
+        needle= term.encode("ascii")
+        pos= self.mm.find(needle, self.tok_off, self.tok_end)
+        while pos != -1:
+            k= bisect_right(self.tok_starts, pos - self.tok_off) - 1
+            end= self.mm.find(b"\n", pos, self.tok_end)
+            hits.append((k, self.mm[self.tok_off + self.tok_starts[k]:end].count(needle)))
+            pos= self.mm.find(needle, end + 1, self.tok_end)
+        if len(self.term_cache) < 1024:
+            self.term_cache[term]= hits
+        return hits
+
+    def search(self, terms):
+        # per paper (arxiv_id, title, title_score, abstract_score); same numbers as str.count on the text
+        scores= None
+        for term in terms:
+            cur= {}
+            for k,mult in self._matching_tokens(term):
+                poff, cnt= TOK.unpack_from(self.sec["TOKTAB"], k * TOK.size)
+                for j in range(cnt):
+                    i, t, a= POST.unpack_from(self.sec["POSTINGS"], poff + j * POST.size)
+                    s= cur.setdefault(i, [0, 0])
+                    s[0]+= t * mult
+                    s[1]+= a * mult
+            if scores is None:
+                scores= cur
+            else:
+                scores= {i: [s[0] + cur[i][0], s[1] + cur[i][1]] for i,s in scores.items() if i in cur}
+            if not scores:
+                return []
+        out= []
+        for i,(st,sa) in (scores or {}).items():
+            pid, title= self._meta(i)
+            out.append((pid, title, st, sa))
+        return out
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python paper_index.py papers.json papers.idx", file=sys.stderr)
+        sys.exit(1)
+    try:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            data= json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"ERROR reading {sys.argv[1]}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not isinstance(data, list):
+        print(f"ERROR {sys.argv[1]} is not a list of papers", file=sys.stderr)
+        sys.exit(1)
+    n_docs, n_tokens= build(data, sys.argv[2])
+    print(f"wrote {sys.argv[2]}: {n_docs} papers, {n_tokens} tokens")
@@ -1,7 +1,17 @@
 import boto3
-import sys,os,json,datetime,argparse
+import sys,os,re,json,time,datetime,argparse,threading,ipaddress
+from contextlib import nullcontext
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError, EndpointConnectionError
 
+MAX_WORKERS= 8
+MAX_ATTEMPTS= 5
+RATE_LIMIT= 0.0 # requests per second per service and region, 0 leaves pacing to adaptive retries
+CACHE_TTL= 6 * 3600 # seconds a cached object count / policy listing is reused
+THROTTLE_CODES= ["Throttling","ThrottlingException","ThrottledException","RequestLimitExceeded","TooManyRequestsException","SlowDown"]
+
 def time_now():
     return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
 
@@ -16,20 +26,17 @@ def timeout(e):
         return True
     try:
         code=e.response.get("Error",{}).get("Code","")
-        return code in ["RequestTimeout","RequestTimeoutException","Throttling","ThrottlingException","ThrottledException"]
+        return code in ["RequestTimeout","RequestTimeoutException"]+THROTTLE_CODES
     except Exception:
         return False
 def call_limit(fn,label):
+    # retries happen per request inside botocore (adaptive mode); a timeout here means they ran out
     try:
         return fn()
     except Exception as e:
         if timeout(e):
-            warn(f"{label} call timed out: {e}")
-            try:
-                return fn()
-            except Exception as e2:
-                warn(f"{label} retry call failed: {e2}")
-                return None
+            warn(f"{label} call failed after {MAX_ATTEMPTS} attempts: {e}")
+            return None
         raise
 
 def access_den(e):
@@ -38,15 +45,234 @@ def access_den(e):
         return code in ["AccessDenied","AccessDeniedException","UnauthorizedOperation"]
     except Exception:
         return False
-def valid_region(session,region):
+
+class TokenBucket:
+    def __init__(self,rate,burst=None):
+        self.rate= rate
+        self.cap= burst if burst else max(1.0,rate)
+        self.tokens= self.cap
+        self.last= time.monotonic()
+        self.lock= threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now= time.monotonic()
+                self.tokens= min(self.cap, self.tokens + (now - self.last) * self.rate)
+                self.last= now
+                if self.tokens >= 1:
+                    self.tokens-= 1
+                    return
+                wait= (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_stats_lock= threading.Lock()
+api_stats= {} # service -> operation -> counters
+collector_stats= {} # collector -> seconds / resources, summed over its tasks
+
+def _count(service,op,**incr):
+    with _stats_lock:
+        st= api_stats.setdefault(service,{}).setdefault(op,{
+            "calls": 0, "retries": 0, "throttles": 0, "errors": 0, "bytes": 0, "latency_ms": 0.0
+        })
+        for k,v in incr.items():
+            st[k]+= v
+
+def _timed(label,seconds,resources=0):
+    with _stats_lock:
+        st= collector_stats.setdefault(label,{"seconds": 0.0, "resources": 0, "tasks": 0})
+        st["seconds"]+= seconds
+        st["resources"]+= resources
+        st["tasks"]+= 1
+
+def _resp_bytes(http_response):
     try:
-        client= session.client("ec2",region_name= region)
+        return int(http_response.headers.get("content-length",0) or 0)
+    except Exception:
+        return 0
+
+_buckets= {} # (service, region) -> TokenBucket, only when --rate is set
+
+def rate_wait(service,region):
+    bucket= _buckets.get((service,region))
+    if bucket:
+        bucket.acquire()
+
+def _hooks(client,service):
+    # before-send fires once per http attempt, so the limiter also paces botocore's own retries
+    if RATE_LIMIT > 0:
+        region= client.meta.region_name
+        with _stats_lock:
+            _buckets.setdefault((service,region),TokenBucket(RATE_LIMIT))
+        client.meta.events.register("before-send", lambda **kw: rate_wait(service,region))
+
+    # event names end in the operation, e.g. after-call.ec2.DescribeInstances
+    def start(context=None, **kw):
+        if context is not None:
+            context["inspector_t0"]= time.perf_counter()
+
+    def elapsed(context):
+        t0= (context or {}).get("inspector_t0")
+        return (time.perf_counter() - t0) * 1000.0 if t0 else 0.0
+
+    def needs_retry(response=None, event_name="", **kw):
+        if response and len(response) > 1:
+            code= (response[1] or {}).get("Error",{}).get("Code","")
+            if code in THROTTLE_CODES:
+                _count(service,event_name.split(".")[-1],throttles=1)
+
+    def after_call(http_response=None, parsed=None, context=None, event_name="", **kw):
+        parsed= parsed or {}
+        _count(service,event_name.split(".")[-1],
+               calls=1,
+               retries=parsed.get("ResponseMetadata",{}).get("RetryAttempts",0),
+               errors=1 if "Error" in parsed else 0,
+               bytes=_resp_bytes(http_response),
+               latency_ms=elapsed(context))
+
+    def after_call_error(context=None, event_name="", **kw):
+        _count(service,event_name.split(".")[-1],calls=1,errors=1,latency_ms=elapsed(context))
+
+    client.meta.events.register("before-parameter-build", start)
+    client.meta.events.register("needs-retry", needs_retry)
+    client.meta.events.register("after-call", after_call)
+    client.meta.events.register("after-call-error", after_call_error)
+
+def scan_metrics(wall=None):
+    with _stats_lock:
+        api= {svc: {op: dict(st) for op,st in ops.items()} for svc,ops in api_stats.items()}
+        collectors= {k: dict(v) for k,v in collector_stats.items()}
+    totals= {"calls": 0, "retries": 0, "throttles": 0, "errors": 0, "bytes": 0}
+    for ops in api.values():
+        for st in ops.values():
+            for k in totals:
+                totals[k]+= st[k]
+            st["avg_latency_ms"]= round(st["latency_ms"] / st["calls"], 2) if st["calls"] else 0.0
+            st["latency_ms"]= round(st["latency_ms"], 2)
+    for st in collectors.values():
+        st["seconds"]= round(st["seconds"], 3)
+    return {
+        "wall_seconds": round(wall, 3) if wall is not None else None,
+        "collectors": collectors,
+        "api_totals": totals,
+        "api": api
+    }
+
+## boto3 sessions are not thread safe but clients are, so clients are built once under a lock and shared by the workers
+_client_lock= threading.Lock()
+_clients= {}
+def get_client(session,service,region=None):
+    key= (id(session),service,region)
+    with _client_lock:
+        client= _clients.get(key)
+        if client is None:
+            cfg= Config(max_pool_connections=max(10,MAX_WORKERS),
+                        retries={"mode": "adaptive", "max_attempts": MAX_ATTEMPTS})
+            if region:
+                client= session.client(service,region_name=region,config=cfg)
+            else:
+                client= session.client(service,config=cfg)
+            _hooks(client,service)
+            _clients[key]= client
+        return client
+
+class ScanCache:
+    # snapshot of the previous scan for one account; expensive per-item results are reused while fresh.
+    # AWS has no bucket/user level ETag, so freshness is the ttl plus an identity check (bucket
+    # creation date, IAM UserId) to catch resources deleted and recreated under the same name.
+    KINDS= ["s3","iam","ami"]
+
+    def __init__(self,cache_dir,account_id,ttl=CACHE_TTL):
+        self.path= os.path.join(cache_dir, f"{account_id}.json")
+        self.ttl= ttl
+        self.lock= threading.Lock()
+        self.prev= {}
+        self.entries= {k: {} for k in self.KINDS}
+        try:
+            with open(self.path,"r") as f:
+                self.prev= json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            warn(f"ignoring unreadable cache {self.path}: {e}")
+        # carry over entries this scan does not touch (other regions, skipped buckets) while still fresh
+        for kind,ents in self.prev.get("entries",{}).items():
+            if kind in self.entries:
+                self.entries[kind].update({k: ent for k,ent in ents.items() if self._fresh(kind,ent)})
+
+    def _fresh(self,kind,ent):
+        return kind == "ami" or time.time() - ent.get("fetched",0) < self.ttl # AMI names never change
+
+    def get(self,kind,key,check=None):
+        with self.lock:
+            ent= self.entries[kind].get(key)
+        if not ent or ent.get("check") != check or not self._fresh(kind,ent):
+            return None
+        return ent.get("value")
+
+    def put(self,kind,key,value,check=None):
+        with self.lock:
+            self.entries[kind][key]= {"value": value, "check": check, "fetched": time.time()}
+
+    def save(self,data,resources=True):
+        # resources=False only refreshes the per-item entries (streamed scans keep no resource lists)
+        snap= dict(self.prev)
+        snap.update({"version": 1, "account_id": data.get("account_id"), "entries": self.entries})
+        if resources:
+            # a section whose listing failed keeps the previous snapshot's list instead of the partial one
+            failed= {tuple(f) for f in data.get("failed",[])}
+            old= self.prev.get("by_region",{})
+            by_region= dict(old)
+            for r,res in data.get("by_region",{}).items():
+                by_region[r]= {svc: old[r][svc] if (r,svc) in failed and svc in old.get(r,{}) else lst
+                               for svc,lst in res.items()}
+            iam_users= data.get("iam_users",[])
+            if ("global","iam_users") in failed and "iam_users" in self.prev:
+                iam_users= self.prev["iam_users"]
+            scanned= dict(self.prev.get("scanned",{}))
+            for r in data.get("regions",[]):
+                scanned[r]= data.get("scan_timestamp")
+            snap.update({
+                "scan_timestamp": data.get("scan_timestamp"),
+                "scanned": scanned,
+                "iam_users": iam_users,
+                "by_region": by_region
+            })
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp= self.path + ".tmp"
+            with open(tmp,"w") as f:
+                json.dump(snap,f)
+            os.replace(tmp,self.path)
+        except Exception as e:
+            err(f"could not write cache {self.path}: {e}")
+
+def avail_regions(session,region):
+    try:
+        client= get_client(session,"ec2",region)
         resp= client.describe_regions(AllRegions= True)
-        regs= [r.get("RegionName","") for r in resp.get("Regions",[])]
-        return region in regs
+        return {r.get("RegionName",""): r.get("OptInStatus","") for r in resp.get("Regions",[])}
     except Exception as e:
         err(f"region validation error: {e}")
-        return False
+        return None
+
+def resolve_regions(session,spec,home):
+    # spec is "all" (every enabled region) or a comma separated list; None if anything is invalid
+    regs= avail_regions(session,home)
+    if not regs:
+        return None
+    if spec.strip().lower() == "all":
+        return sorted(r for r,st in regs.items() if st != "not-opted-in")
+    wanted= []
+    for r in spec.split(","):
+        r= r.strip()
+        if not r or r in wanted:
+            continue
+        if r not in regs:
+            err(f"unknown region: {r}")
+            return None
+        wanted.append(r)
+    return wanted or None
 
 def creds_aws(region):
     try:
@@ -63,15 +289,24 @@ def creds_aws(region):
 
 def args():
     ap=argparse.ArgumentParser()
-    ap.add_argument('--region',default='us-east-1')
+    ap.add_argument('--region',default='us-east-1',help="region, comma separated list of regions, or 'all'")
+    ap.add_argument('--workers',type=int,default=MAX_WORKERS)
+    ap.add_argument('--max-attempts',type=int,default=MAX_ATTEMPTS,help="attempts per request, including the first")
+    ap.add_argument('--cache',default=None,help="directory for scan snapshots, enables incremental scans")
+    ap.add_argument('--cache-ttl',type=int,default=CACHE_TTL,help="seconds cached per-item results stay valid")
+    ap.add_argument('--diff',action='store_true',help="only report changes since the cached snapshot (needs --cache)")
+    ap.add_argument('--exposure',nargs='?',const='all',default=None,
+                    help="add security group exposure findings, optionally only for these ports (e.g. 22,3389)")
+    ap.add_argument('--exposure-protocol',default=None,choices=['tcp','udp'],
+                    help="protocol the exposure ports are checked for (default tcp when ports are given, else any)")
+    ap.add_argument('--rate',type=float,default=RATE_LIMIT,help="max requests per second per service and region (default 0 = off, adaptive retries back off on throttling)")
     ap.add_argument('--output',default=None)
-    ap.add_argument('--format',default='json',choices=['json','table'])
+    ap.add_argument('--format',default='json',choices=['json','table','jsonl'])
     return ap.parse_args()
 
 
-def iam(session):
-    client= session.client('iam')
-    users=[]
+def iter_iam(session,cache=None):
+    client= get_client(session,'iam')
     try:
         pag= client.get_paginator('list_users')
         for page in pag.paginate():
@@ -93,41 +328,45 @@ def iam(session):
                         err(f"iam access error for {username}: {e}")
                     else:
                         err(f"iam get_user error {username}: {e}")
-                attached_policies= []
-                try:
-                    pag2= client.get_paginator('list_attached_user_policies')
-                    for page2 in pag2.paginate(UserName=username):
-                        for p in page2.get('AttachedPolicies', []):
-                            attached_policies.append({
-                                'policy_name': p.get('PolicyName',''),
-                                'policy_arn': p.get('PolicyArn','')
-                            })
-                except ClientError as e:
-                    if access_den(e):
-                        err(f"iam access error for {username}: {e}")
-                    else:
-                        err(f"iam list_attached_user_policies error for {username}: {e}")
-                users.append({
+                attached_policies= cache.get("iam",username,userid) if cache else None
+                if attached_policies is None:
+                    attached_policies= []
+                    try:
+                        pag2= client.get_paginator('list_attached_user_policies')
+                        for page2 in pag2.paginate(UserName=username):
+                            for p in page2.get('AttachedPolicies', []):
+                                attached_policies.append({
+                                    'policy_name': p.get('PolicyName',''),
+                                    'policy_arn': p.get('PolicyArn','')
+                                })
+                        if cache:
+                            cache.put("iam",username,attached_policies,userid)
+                    except ClientError as e:
+                        if access_den(e):
+                            err(f"iam access error for {username}: {e}")
+                        else:
+                            err(f"iam list_attached_user_policies error for {username}: {e}")
+                yield {
                     'username': username,
                     'user_id': userid,
                     'arn': userarn,
                     'create_date': create_date,
                     'last_activity': last_activity,
                     'attached_policies': attached_policies
-                })
-        return users
+                }
     except ClientError as e:  
         if access_den(e):
             err(f"iam access error: {e}")
-            return []
         else:  
             err(f"iam list_users error: {e}")
-        return []
+        return False
 
+def iam(session,cache=None):
+    return list(iter_iam(session,cache))
 
-def ec2_inst(session,region):
-    client= session.client("ec2",region_name=region)
-    instances=[]
+
+def iter_ec2_inst(session,region,cache=None):
+    client= get_client(session,"ec2",region)
     try:
         pag= client.get_paginator("describe_instances")
         for page in pag.paginate():
@@ -142,13 +381,15 @@ def ec2_inst(session,region):
                     launch_time= inst.get("LaunchTime",None)
                     launch_date= launch_time.isoformat().replace('+00:00', 'Z') if launch_time else None
                     ami_id= inst.get("ImageId","")
-                    ami_name= None
-                    if ami_id:
+                    ami_name= cache.get("ami",f"{region}/{ami_id}") if cache and ami_id else None
+                    if ami_id and ami_name is None:
                         try:
                             img= client.describe_images(ImageIds=[ami_id])
                             images= img.get("Images",[])
                             if images:
                                 ami_name= images[0].get("Name")
+                                if cache and ami_name is not None:
+                                    cache.put("ami",f"{region}/{ami_id}",ami_name)
                         except ClientError as e:
                             if access_den(e):
                                 err(f"ec2 access error for AMI {ami_id}: {e}")
@@ -166,7 +407,7 @@ def ec2_inst(session,region):
                         value= tag.get("Value")
                         if key is not None and value is not None:
                             tags[key]= value
-                    instances.append({
+                    yield {
                         "instance_id": instance_id,
                         "instance_type": instance_type,
                         "state": state,
@@ -178,14 +419,16 @@ def ec2_inst(session,region):
                         "ami_name": ami_name,
                         "security_groups": security_groups,
                         "tags": tags
-                    })  
-        return instances
+                    }
     except ClientError as e:
         if access_den(e):
             err(f"ec2 access error: {e}")
         else:
             err(f"ec2 describe_instances error: {e}")
-        return []
+        return False
+
+def ec2_inst(session,region,cache=None):
+    return list(iter_ec2_inst(session,region,cache))
     
 def s3_helper(client,bucket_name):
     count= 0
@@ -203,41 +446,65 @@ def s3_helper(client,bucket_name):
 
         else:
             err(f"s3 list_objects_v2 error for bucket {bucket_name}: {e}")
-        return 0, 0
+        return None
                 
                     
-def s3_buckets(session,region):
-    client= session.client("s3")
-    buckets=[]
+def s3_index(session):
+    # list_buckets is global, so this runs once per scan and groups buckets by region
+    client= get_client(session,"s3")
+    by_region= {}
     try:
         resp= client.list_buckets()
-        for b in resp.get("Buckets",[]):
-            bucket_name= b.get("Name","")
-            try:
-                bucket_location= client.get_bucket_location(Bucket=bucket_name)
-                loc= bucket_location.get("LocationConstraint")
-                bucket_region= loc if loc else "us-east-1"
-            except ClientError:
-                continue
-            if bucket_region != region:
-                continue
-            creation_date= b.get("CreationDate",None)
-            creation_date_str= creation_date.isoformat().replace('+00:00', 'Z') if creation_date else None
-            obj_count, size_bytes= s3_helper(client,bucket_name)
-            buckets.append({
-                "bucket_name": bucket_name,
-                "creation_date": creation_date_str,
-                "region": bucket_region,
-                "object_count": obj_count,
-                "size_bytes": size_bytes
-            })
-        return buckets
     except ClientError as e:
         if access_den(e):
             err(f"s3 access error: {e}")
         else:
             err(f"s3 list_buckets error: {e}")
-        return []
+        return None
+    for b in resp.get("Buckets",[]):
+        bucket_name= b.get("Name","")
+        try:
+            bucket_location= client.get_bucket_location(Bucket=bucket_name)
+            loc= bucket_location.get("LocationConstraint")
+            bucket_region= loc if loc else "us-east-1"
+        except ClientError:
+            continue
+        by_region.setdefault(bucket_region,[]).append(b)
+    return by_region
+
+def _s3_bucket(session,b,bucket_region,cache=None):
+    # (info, ok); ok is False when the objects could not be listed and the counts are placeholders
+    bucket_name= b.get("Name","")
+    creation_date= b.get("CreationDate",None)
+    creation_date_str= creation_date.isoformat().replace('+00:00', 'Z') if creation_date else None
+    cached= cache.get("s3",bucket_name,creation_date_str) if cache else None
+    if cached is not None:
+        obj_count, size_bytes= cached
+    else:
+        counted= s3_helper(get_client(session,"s3",bucket_region),bucket_name)
+        obj_count, size_bytes= counted if counted is not None else (0, 0)
+        if cache and counted is not None: # a failed listing is retried next scan, not cached
+            cache.put("s3",bucket_name,list(counted),creation_date_str)
+    return {
+        "bucket_name": bucket_name,
+        "creation_date": creation_date_str,
+        "region": bucket_region,
+        "object_count": obj_count,
+        "size_bytes": size_bytes
+    }, cached is not None or counted is not None
+
+def s3_bucket_info(session,b,bucket_region,cache=None):
+    return _s3_bucket(session,b,bucket_region,cache)[0]
+
+def iter_s3_bucket(session,b,bucket_region,cache=None):
+    info, ok= _s3_bucket(session,b,bucket_region,cache)
+    yield info
+    return ok
+
+def s3_buckets(session,region,index=None,cache=None):
+    if index is None:
+        index= s3_index(session) or {}
+    return [s3_bucket_info(session,b,region,cache) for b in index.get(region,[])]
 
 
 def secg_helper(sg, direction):
@@ -271,9 +538,8 @@ def secg_helper(sg, direction):
                 })
     return rules
 
-def security_groups(session,region):
-    client= session.client("ec2",region_name=region)
-    sgs=[]
+def iter_security_groups(session,region):
+    client= get_client(session,"ec2",region)
     try:
         pag= client.get_paginator("describe_security_groups")
         for page in pag.paginate():
@@ -282,45 +548,296 @@ def security_groups(session,region):
                 sg_name= sg.get("GroupName","")
                 description= sg.get("Description","")
                 vpc_id= sg.get("VpcId",None)
-                sgs.append({
+                yield {
                     "group_id": sg_id,
                     "group_name": sg_name,
                     "description": description,
                     "vpc_id": vpc_id,
                     "inbound_rules": secg_helper(sg.get("IpPermissions",[]),"inbound"),
                     "outbound_rules": secg_helper(sg.get("IpPermissionsEgress",[]),"outbound")
-                })
-        return sgs
+                }
     except ClientError as e:
         if access_den(e):
             err(f"ec2 access error for security groups: {e}")
         else:
             err(f"ec2 describe_security_groups error: {e}")
-        return []
+        return False
+
+def security_groups(session,region):
+    return list(iter_security_groups(session,region))
     
+RISKY_PORTS= [22,23,445,1433,3306,3389,5432,5900,6379,9200,27017]
+PORT_PROTOCOLS= ["tcp","udp","6","17","-1","all"] # icmp and the rest carry type/code in the port fields
+
+def _ports(port_range):
+    if port_range == "all":
+        return 0, 65535
+    m= re.match(r"^(\d+)(?:-(\d+))?$", port_range or "")
+    if not m:
+        return None
+    lo= int(m.group(1))
+    hi= int(m.group(2)) if m.group(2) else lo
+    return (lo, hi) if lo <= hi <= 65535 else None
+
+def _proto_match(rule_proto,proto):
+    return rule_proto in ["-1","all",proto] or {"6": "tcp", "17": "udp"}.get(rule_proto) == proto
+
+def _public(net):
+    return net is not None and (net.prefixlen == 0 or net.is_global)
+
+class IntervalTree:
+    # centered interval tree over (lo, hi, item) tuples; stab(p) returns the items whose range holds p
+    def __init__(self,ivs):
+        pts= sorted(x for lo,hi,_ in ivs for x in (lo,hi))
+        self.center= pts[len(pts) // 2] if pts else 0
+        mid= [iv for iv in ivs if iv[0] <= self.center <= iv[1]]
+        self.by_lo= sorted(mid, key=lambda iv: iv[0])
+        self.by_hi= sorted(mid, key=lambda iv: -iv[1])
+        left= [iv for iv in ivs if iv[1] < self.center]
+        right= [iv for iv in ivs if iv[0] > self.center]
+        self.left= IntervalTree(left) if left else None
+        self.right= IntervalTree(right) if right else None
+
+    def stab(self,p):
+        out= []
+        node= self
+        while node is not None:
+            if p < node.center:
+                for lo,hi,item in node.by_lo:
+                    if lo > p:
+                        break
+                    out.append(item)
+                node= node.left
+            elif p > node.center:
+                for lo,hi,item in node.by_hi:
+                    if hi < p:
+                        break
+                    out.append(item)
+                node= node.right
+            else:
+                out.extend(item for _,_,item in node.by_lo)
+                break
+        return out
+
+class ExposureIndex:
+    # one region: security group -> running instances, plus the inbound rules open to public CIDRs in an
+    # interval tree over ports. sg: sources become edges, so exposure follows group references (pivot
+    # through a member). Private CIDR rules can't expose anything and are left out.
+    def __init__(self,instances,groups):
+        self.members= {}
+        for inst in instances:
+            if inst.get("state") != "running":
+                continue
+            for gid in inst.get("security_groups",[]):
+                self.members.setdefault(gid,[]).append(inst)
+        self.rules= []
+        self.admits= {} # source group -> rules on other groups that allow it
+        self.public= [] # rule ids open to a public CIDR
+        spans= {} # (lo, hi) -> public rule ids; real accounts reuse a handful of port ranges
+        nets= {} # CIDR -> is public, classified once per distinct CIDR
+        for sg in groups:
+            for rule in sg.get("inbound_rules",[]):
+                ports= _ports(rule.get("port_range"))
+                src= rule.get("source","")
+                if ports is None or src == "none" or rule.get("protocol","") not in PORT_PROTOCOLS:
+                    continue
+                if not src.startswith("sg:"):
+                    if src not in nets:
+                        try:
+                            nets[src]= _public(ipaddress.ip_network(src, strict=False))
+                        except ValueError:
+                            nets[src]= False
+                    if not nets[src]:
+                        continue
+                rid= len(self.rules)
+                self.rules.append({"group_id": sg.get("group_id",""), "protocol": rule.get("protocol",""),
+                                   "lo": ports[0], "hi": ports[1], "port_range": rule.get("port_range"),
+                                   "source": src})
+                if src.startswith("sg:"):
+                    self.admits.setdefault(src[3:],[]).append(rid)
+                else:
+                    self.public.append(rid)
+                    spans.setdefault(ports,[]).append(rid)
+        self.tree= IntervalTree([(lo,hi,rids) for (lo,hi),rids in spans.items()])
+
+    def _stab(self,port):
+        return [rid for rids in self.tree.stab(port) for rid in rids]
+
+    def _finding(self,inst,r,via,hops):
+        # RISKY_PORTS are tcp services, so a udp range only counts when it opens every port
+        risky= (r["lo"] <= 0 and r["hi"] >= 65535) or (_proto_match(r["protocol"],"tcp") and
+                                                    any(r["lo"] <= p <= r["hi"] for p in RISKY_PORTS))
+        return {
+            "severity": "low" if hops else ("high" if risky else "medium"),
+            "instance_id": inst.get("instance_id",""),
+            "public_ip": inst.get("public_ip"),
+            "group_id": r["group_id"],
+            "protocol": r["protocol"],
+            "port_range": r["port_range"],
+            "source": r["source"],
+            "via": via,
+            "hops": hops
+        }
+
+    def findings(self,ports=None,protocol=None):
+        # ports limits the audit to those ports (tree lookups); None checks every rule with a public source.
+        # protocol (tcp/udp) keeps only rules admitting it, None keeps all
+        def wanted(r):
+            return protocol is None or _proto_match(r["protocol"],protocol)
+        if ports is None:
+            direct= [rid for rid in self.public if wanted(self.rules[rid])]
+        else:
+            direct= sorted({rid for p in ports for rid in self._stab(p) if wanted(self.rules[rid])})
+        out= []
+        frontier= {}
+        for rid in direct:
+            r= self.rules[rid]
+            for inst in self.members.get(r["group_id"],[]):
+                if inst.get("public_ip"):
+                    out.append(self._finding(inst,r,[],0))
+                    frontier.setdefault(r["group_id"],[r["group_id"]])
+        # breadth first over sg: references so each group is reported once, at its shortest path
+        seen= set(frontier)
+        hops= 0
+        while frontier:
+            hops+= 1
+            nxt= {}
+            done= set(seen)
+            for src,path in frontier.items():
+                for rid in self.admits.get(src,[]):
+                    r= self.rules[rid]
+                    if r["group_id"] in done or not wanted(r):
+                        continue
+                    if ports is not None and not any(r["lo"] <= p <= r["hi"] for p in ports):
+                        continue
+                    for inst in self.members.get(r["group_id"],[]):
+                        out.append(self._finding(inst,r,path,hops))
+                    if r["group_id"] not in seen and self.members.get(r["group_id"]):
+                        seen.add(r["group_id"])
+                        nxt[r["group_id"]]= path + [r["group_id"]]
+            frontier= nxt
+        return out
+
+def exposure(by_region,ports=None,protocol=None):
+    return {r: ExposureIndex(res.get("ec2_instances",[]),res.get("security_groups",[])).findings(ports,protocol)
+            for r,res in by_region.items()}
+
+REGIONAL= ["ec2_instances","s3_buckets","security_groups"]
+
+def region_summary(res):
+    return {
+        "running_instances": len([i for i in res.get("ec2_instances",[]) if i.get("state") == "running"]),
+        "total_buckets": len(res.get("s3_buckets",[])),
+        "security_groups": len(res.get("security_groups",[]))
+    }
+
 def out_json(data):
+    regions= data.get("regions",[])
+    by_region= data.get("by_region",{})
     account_info= {
         "account_id": data.get("account_id"),
         "user_arn": data.get("user_arn"),
-        "region": data.get("region"),
         "scan_timestamp": data.get("scan_timestamp")
     }
-    resources= {
-        "iam_users": data.get("iam_users",[]),
-        "ec2_instances": data.get("ec2_instances",[]),
-        "s3_buckets": data.get("s3_buckets",[]),
-        "security_groups": data.get("security_groups",[])
+    summary= {"total_users": len(data.get("iam_users",[]))}
+    per_region= {r: region_summary(by_region.get(r,{})) for r in regions}
+    for key in ["running_instances","total_buckets","security_groups"]:
+        summary[key]= sum(rs[key] for rs in per_region.values())
+
+    if len(regions) == 1: # single region keeps the flat layout
+        account_info["region"]= regions[0]
+        res= by_region.get(regions[0],{})
+        resources= {"iam_users": data.get("iam_users",[])}
+        for key in REGIONAL:
+            resources[key]= res.get(key,[])
+    else:
+        account_info["regions"]= regions
+        resources= {
+            "iam_users": data.get("iam_users",[]),
+            "regions": {r: {key: by_region.get(r,{}).get(key,[]) for key in REGIONAL} for r in regions}
+        }
+        summary["by_region"]= per_region
+    out= {
+        "account_info": account_info,
+        "resources": resources,
+        "summary": summary,
+        "scan_metrics": data.get("scan_metrics",{})
     }
-    summary= {
-        "total_users": len(resources["iam_users"]),
-        "running_instances": len([i for i in resources["ec2_instances"] if i.get("state") == "running"]),
-        "total_buckets": len(resources["s3_buckets"]),
-        "security_groups": len(resources["security_groups"])
+    if "exposure" in data:
+        out["exposure"]= data["exposure"]
+    return out
+
+
+
+RES_KEYS= {
+    "iam_users": "username",
+    "ec2_instances": "instance_id",
+    "s3_buckets": "bucket_name",
+    "security_groups": "group_id"
+}
+
+def diff_list(old,new,key):
+    o= {r.get(key): r for r in old}
+    n= {r.get(key): r for r in new}
+    changed= []
+    for k,cur in n.items():
+        if k in o and o[k] != cur:
+            fields= sorted(f for f in set(o[k]) | set(cur) if o[k].get(f) != cur.get(f))
+            changed.append({key: k, "fields": fields, "current": cur})
+    return {
+        "added": [cur for k,cur in n.items() if k not in o],
+        "removed": [k for k in o if k not in n],
+        "changed": changed
     }
+
+def scan_diff(prev,data):
+    # empty sections are dropped so the output only carries what changed; sections whose listing
+    # failed are skipped, a partial list would read as everything missing being removed
+    out= {}
+    failed= {tuple(f) for f in data.get("failed",[])}
+    if ("global","iam_users") not in failed:
+        d= diff_list(prev.get("iam_users",[]), data.get("iam_users",[]), RES_KEYS["iam_users"])
+        if any(d.values()):
+            out["iam_users"]= d
+    regions= {}
+    for r in data.get("regions",[]):
+        old= prev.get("by_region",{}).get(r,{})
+        new= data.get("by_region",{}).get(r,{})
+        for svc in REGIONAL:
+            if (r,svc) in failed:
+                continue
+            d= diff_list(old.get(svc,[]), new.get(svc,[]), RES_KEYS[svc])
+            if any(d.values()):
+                regions.setdefault(r,{})[svc]= d
+    if regions:
+        out["regions"]= regions
+    return out
+
+def _diff_sections(diff):
+    if "iam_users" in diff:
+        yield "global", "iam_users", diff["iam_users"]
+    for r,svcs in diff.get("regions",{}).items():
+        for svc,d in svcs.items():
+            yield r, svc, d
+
+def out_diff(data):
+    diff= data.get("diff",{})
+    summary= {"added": 0, "removed": 0, "changed": 0}
+    for _,_,d in _diff_sections(diff):
+        for k in summary:
+            summary[k]+= len(d[k])
     return {
-        "account_info": account_info,
-        "resources": resources,
-        "summary": summary
+        "account_info": {
+            "account_id": data.get("account_id"),
+            "user_arn": data.get("user_arn"),
+            "regions": data.get("regions",[]),
+            "scan_timestamp": data.get("scan_timestamp"),
+            "previous_scan": data.get("previous_scan")
+        },
+        "diff": diff,
+        "summary": summary,
+        "skipped": data.get("failed",[]),
+        "scan_metrics": data.get("scan_metrics",{})
     }
 
 
@@ -370,8 +887,10 @@ def _print_table(title, headers, rows):
     print("")
 
 def out_table(data):
+    regions= data.get("regions",[])
+    by_region= data.get("by_region",{})
     # header
-    print(f"AWS Account: {data.get('account_id','-')} ({data.get('region','-')})")
+    print(f"AWS Account: {data.get('account_id','-')} ({', '.join(regions) or '-'})")
     ts= data.get("scan_timestamp","-")
     print(f"Scan Time: {str(ts).replace('T',' ')[:19]} UTC")
     print("")
@@ -390,63 +909,131 @@ def out_table(data):
                  ["Username","Create Date","Last Activity","Policies"],
                  rows)
 
-    # EC2
-    inst= data.get("ec2_instances",[])
-    run_ct= 0
-    for i in inst:
-        if i.get("state") == "running":
-            run_ct += 1
+    for region in regions:
+        res= by_region.get(region,{})
+        tag= f" [{region}]" if len(regions) > 1 else ""
+
+        # EC2
+        inst= res.get("ec2_instances",[])
+        run_ct= 0
+        for i in inst:
+            if i.get("state") == "running":
+                run_ct += 1
+
+        rows= []
+        for it in inst:
+            rows.append([
+                _fmt(it.get("instance_id",""), 22),
+                _fmt(it.get("instance_type",""), 10),
+                _fmt(it.get("state",""), 10),
+                _fmt(it.get("public_ip","-") or "-", 16),
+                _fmt((it.get("launch_time","-") or "-")[:16].replace("T"," "), 16)
+            ])
+        _print_table(f"EC2 INSTANCES{tag} ({run_ct} running, {len(inst) - run_ct} stopped)",
+                     ["Instance ID","Type","State","Public IP","Launch Time"],
+                     rows)
+
+        # S3
+        buckets= res.get("s3_buckets",[])
+        rows= []
+        for b in buckets:
+            size_mb= (b.get("size_bytes",0) or 0) / (1024.0 * 1024.0)
+            rows.append([
+                _fmt(b.get("bucket_name",""), 35),
+                _fmt(b.get("region",""), 10),
+                _fmt((b.get("creation_date","-") or "-")[:10], 10),
+                str(b.get("object_count",0)),
+                f"~{size_mb:.1f}"
+            ])
+        _print_table(f"S3 BUCKETS{tag} ({len(buckets)} total)",
+                     ["Bucket Name","Region","Created","Objects","Size (MB)"],
+                     rows)
 
+        # SG
+        sgs= res.get("security_groups",[])
+        rows= []
+        for sg in sgs:
+            rows.append([
+                _fmt(sg.get("group_id",""), 14),
+                _fmt(sg.get("group_name",""), 18),
+                _fmt(sg.get("vpc_id","-") or "-", 14),
+                str(len(sg.get("inbound_rules",[]) or []))
+            ])
+        _print_table(f"SECURITY GROUPS{tag} ({len(sgs)} total)",
+                     ["Group ID","Name","VPC ID","Inbound Rules"],
+                     rows)
+
+    if "exposure" in data:
+        rows= []
+        for region,found in data["exposure"].items():
+            for f in found:
+                rows.append([
+                    f["severity"],
+                    _fmt(f["instance_id"], 22),
+                    _fmt(f.get("public_ip") or "-", 16),
+                    _fmt(f["group_id"], 14),
+                    _fmt(f"{f['protocol']}/{f['port_range']}", 16),
+                    _fmt(f["source"], 20),
+                    _fmt(" > ".join(f["via"]) or "-", 30)
+                ])
+        _print_table(f"EXPOSURE ({len(rows)} findings)",
+                     ["Severity","Instance ID","Public IP","Group ID","Ports","Source","Via"],
+                     rows)
+
+    metrics_footer(data.get("scan_metrics",{}))
+
+def metrics_footer(m):
+    if not m:
+        return
     rows= []
-    for it in inst:
-        rows.append([
-            _fmt(it.get("instance_id",""), 22),
-            _fmt(it.get("instance_type",""), 10),
-            _fmt(it.get("state",""), 10),
-            _fmt(it.get("public_ip","-") or "-", 16),
-            _fmt((it.get("launch_time","-") or "-")[:16].replace("T"," "), 16)
-        ])
-    _print_table(f"EC2 INSTANCES ({run_ct} running, {len(inst) - run_ct} stopped)",
-                 ["Instance ID","Type","State","Public IP","Launch Time"],
+    for label,st in sorted(m.get("collectors",{}).items(), key=lambda kv: -kv[1]["seconds"]):
+        rows.append([_fmt(label, 32), f"{st['seconds']:.2f}", str(st["resources"]), str(st["tasks"])])
+    _print_table("COLLECTORS",
+                 ["Collector","Seconds","Resources","Tasks"],
                  rows)
-
-    # S3
-    buckets= data.get("s3_buckets",[])
     rows= []
-    for b in buckets:
-        size_mb= (b.get("size_bytes",0) or 0) / (1024.0 * 1024.0)
-        rows.append([
-            _fmt(b.get("bucket_name",""), 35),
-            _fmt(b.get("region",""), 10),
-            _fmt((b.get("creation_date","-") or "-")[:10], 10),
-            str(b.get("object_count",0)),
-            f"~{size_mb:.1f}"
-        ])
-    _print_table(f"S3 BUCKETS ({len(buckets)} total)",
-                 ["Bucket Name","Region","Created","Objects","Size (MB)"],
+    for svc,ops in m.get("api",{}).items():
+        for op,st in ops.items():
+            rows.append([_fmt(f"{svc}.{op}", 40), str(st["calls"]), str(st["retries"]), str(st["throttles"]),
+                         str(st["errors"]), f"{st['avg_latency_ms']:.1f}"])
+    rows.sort(key=lambda r: -int(r[1]))
+    _print_table("API CALLS",
+                 ["Operation","Calls","Retries","Throttled","Errors","Avg ms"],
                  rows)
+    t= m.get("api_totals",{})
+    wall= m.get("wall_seconds")
+    print(f"Scan: {wall if wall is not None else '-'} s, {t.get('calls',0)} API calls, "
+          f"{t.get('retries',0)} retries ({t.get('throttles',0)} throttled), {t.get('bytes',0) / 1024.0:.1f} KB")
 
-    # SG
-    sgs= data.get("security_groups",[])
+def out_diff_table(data):
+    print(f"AWS Account: {data.get('account_id','-')} ({', '.join(data.get('regions',[])) or '-'})")
+    print(f"Changes since: {str(data.get('previous_scan') or 'never').replace('T',' ')[:19]}")
+    print("")
     rows= []
-    for sg in sgs:
-        rows.append([
-            _fmt(sg.get("group_id",""), 14),
-            _fmt(sg.get("group_name",""), 18),
-            _fmt(sg.get("vpc_id","-") or "-", 14),
-            str(len(sg.get("inbound_rules",[]) or []))
-        ])
-    _print_table(f"SECURITY GROUPS ({len(sgs)} total)",
-                 ["Group ID","Name","VPC ID","Inbound Rules"],
+    for scope,svc,d in _diff_sections(data.get("diff",{})):
+        key= RES_KEYS[svc]
+        for r in d["added"]:
+            rows.append(["+", scope, svc, _fmt(r.get(key,""), 35), ""])
+        for k in d["removed"]:
+            rows.append(["-", scope, svc, _fmt(k, 35), ""])
+        for c in d["changed"]:
+            rows.append(["~", scope, svc, _fmt(c.get(key,""), 35), _fmt(",".join(c["fields"]), 40)])
+    _print_table(f"CHANGES ({len(rows)} total)",
+                 ["","Scope","Type","Resource","Fields"],
                  rows)
+    for scope,svc in data.get("failed",[]):
+        print(f"not compared, listing failed: {svc} ({scope})")
+    metrics_footer(data.get("scan_metrics",{}))
     
 ###########################################################
 
 
 
 def output_results(data, output_file, output_format):
+    diff_mode= "diff" in data
+    table_fn= out_diff_table if diff_mode else out_table
     if output_format == "json":
-        out= out_json(data)
+        out= out_diff(data) if diff_mode else out_json(data)
         out_str= json.dumps(out, indent=2)
         if output_file:
             try:
@@ -464,7 +1051,7 @@ def output_results(data, output_file, output_format):
             t=sys.stdout
             with open(output_file,"w") as f:
                 sys.stdout= f
-                out_table(data)
+                table_fn(data)
             sys.stdout= t
         except Exception as e:
             try:
@@ -474,7 +1061,7 @@ def output_results(data, output_file, output_format):
             err(f"could not write output file {output_file}: {e}")
             sys.exit(1)
     else:
-        out_table(data)
+        table_fn(data)
 
 
 
@@ -485,39 +1072,146 @@ def output_results(data, output_file, output_format):
 
 
 
-a= args()
-session, identity= creds_aws(a.region)
-if not session or not identity:
-    err("Could not authenticate to AWS. Exiting.")
-    sys.exit(1)
-if not valid_region(session,a.region):
-    err(f"Invalid region specified: {a.region}. Exiting.")
-    sys.exit(1)
-account_id= identity.get("Account","")
-user_arn= identity.get("Arn","")
-iam_users= call_limit(lambda: iam(session), "iam")
-if iam_users is None:
+def _drain(gen,emit,service,region,label):
+    # True if the collector finished its listing; collectors log a failure and return False
+    t0= time.perf_counter()
+    n= 0
+    try:
+        while True:
+            try:
+                rec= next(gen)
+            except StopIteration as stop:
+                return stop.value is not False
+            emit(service,region,rec)
+            n+= 1
+    finally:
+        _timed(label,time.perf_counter() - t0,n)
+
+def scan_stream(session,regions,emit,workers=MAX_WORKERS,cache=None):
+    # emit(service, region, record) is called once per resource as pages arrive, serialized by a lock;
+    # IAM and the S3 bucket index are global and fetched once, everything regional runs in the pool.
+    # returns the (region, service) sections whose listing failed or came back partial
+    lock= threading.Lock()
+    failed= set()
+    def locked(service,region,rec):
+        with lock:
+            emit(service,region,rec)
+
+    with ThreadPoolExecutor(max_workers=max(1,workers)) as ex:
+        futs= [(("global","iam_users"), ex.submit(call_limit, partial(_drain,iter_iam(session,cache),locked,"iam_users","global","iam"), "iam"))]
+        for r in regions:
+            futs.append(((r,"ec2_instances"), ex.submit(call_limit, partial(_drain,iter_ec2_inst(session,r,cache),locked,"ec2_instances",r,f"ec2_instances {r}"), f"ec2_instances {r}")))
+            futs.append(((r,"security_groups"), ex.submit(call_limit, partial(_drain,iter_security_groups(session,r),locked,"security_groups",r,f"security_groups {r}"), f"security_groups {r}")))
+        t0= time.perf_counter()
+        index= call_limit(partial(s3_index,session), "s3_buckets")
+        if index is None:
+            failed.update((r,"s3_buckets") for r in regions)
+            index= {}
+        _timed("s3_index",time.perf_counter() - t0,sum(len(v) for v in index.values()))
+        for r in regions:
+            for b in index.get(r,[]):
+                futs.append(((r,"s3_buckets"), ex.submit(call_limit, partial(_drain,iter_s3_bucket(session,b,r,cache),locked,"s3_buckets",r,f"s3_buckets {r}"), f"s3_buckets {b.get('Name','')}")))
+        for section,fut in futs:
+            if not fut.result(): # call_limit gives None when retries ran out
+                failed.add(section)
+    return failed
+
+def scan(session,regions,workers=MAX_WORKERS,cache=None):
     iam_users= []
+    by_region= {r: {"ec2_instances": [], "s3_buckets": [], "security_groups": []} for r in regions}
+    def collect(service,region,rec):
+        if service == "iam_users":
+            iam_users.append(rec)
+        else:
+            by_region[region][service].append(rec)
+    failed= scan_stream(session,regions,collect,workers,cache)
+    for res in by_region.values(): # buckets finish in any order
+        res["s3_buckets"].sort(key=lambda b: b.get("bucket_name",""))
+    return iam_users, by_region, failed
 
-ec2_instances= call_limit(lambda: ec2_inst(session,a.region), "ec2_instances")
-if ec2_instances is None:
-    ec2_instances= []
-s3_list= call_limit(lambda: s3_buckets(session,a.region), "s3_buckets")
-if s3_list is None:
-    s3_list= []
-
-sec_g= call_limit(lambda: security_groups(session,a.region), "security_groups")
-if sec_g is None:
-    sec_g= []
-
-output_data= {
-    "account_id": account_id,
-    "user_arn": user_arn,
-    "region": a.region,
-    "scan_timestamp": time_now(),
-    "iam_users": iam_users,
-    "ec2_instances": ec2_instances,
-    "s3_buckets": s3_list,
-    "security_groups": sec_g
-}
-output_results(output_data,a.output,a.format)
\ No newline at end of file
+def write_jsonl(session,regions,head,output_file,workers=MAX_WORKERS,cache=None):
+    # one record per line, written as collectors page through results; only the counters stay in memory
+    summary= {"total_users": 0, "running_instances": 0, "total_buckets": 0, "security_groups": 0}
+    keys= {"iam_users": "total_users", "s3_buckets": "total_buckets", "security_groups": "security_groups"}
+    try:
+        with (open(output_file,"w") if output_file else nullcontext(sys.stdout)) as f:
+            def emit(service,region,rec):
+                if service in keys:
+                    summary[keys[service]]+= 1
+                elif rec.get("state") == "running":
+                    summary["running_instances"]+= 1
+                f.write(json.dumps({"service": service, "region": region, **rec}) + "\n")
+            f.write(json.dumps({"service": "account_info", **head}) + "\n")
+            t0= time.perf_counter()
+            scan_stream(session,regions,emit,workers,cache)
+            f.write(json.dumps({"service": "summary", **summary, "scan_metrics": scan_metrics(time.perf_counter() - t0)}) + "\n")
+    except OSError as e:
+        err(f"could not write output file {output_file}: {e}")
+        sys.exit(1)
+
+def main():
+    global MAX_WORKERS, MAX_ATTEMPTS, RATE_LIMIT
+    a= args()
+    MAX_WORKERS= max(1,a.workers)
+    MAX_ATTEMPTS= max(1,a.max_attempts)
+    if a.diff and not a.cache:
+        err("--diff needs --cache to compare against. Exiting.")
+        sys.exit(1)
+    if (a.diff or a.exposure) and a.format == "jsonl":
+        err("--diff and --exposure cannot be streamed, use json or table. Exiting.")
+        sys.exit(1)
+    ports= None
+    if a.exposure and a.exposure != "all":
+        try:
+            ports= [int(p) for p in a.exposure.split(",") if p.strip()]
+        except ValueError:
+            err(f"Invalid exposure ports: {a.exposure}. Exiting.")
+            sys.exit(1)
+    RATE_LIMIT= max(0.0,a.rate)
+    home= a.region.split(",")[0].strip()
+    if not home or home.lower() == "all":
+        home= "us-east-1"
+    session, identity= creds_aws(home)
+    if not session or not identity:
+        err("Could not authenticate to AWS. Exiting.")
+        sys.exit(1)
+    regions= resolve_regions(session,a.region,home)
+    if not regions:
+        err(f"Invalid region specified: {a.region}. Exiting.")
+        sys.exit(1)
+    account_id= identity.get("Account","")
+    user_arn= identity.get("Arn","")
+    cache= ScanCache(a.cache,account_id,a.cache_ttl) if a.cache else None
+    if a.format == "jsonl":
+        head= {"account_id": account_id, "user_arn": user_arn, "regions": regions, "scan_timestamp": time_now()}
+        write_jsonl(session,regions,head,a.output,MAX_WORKERS,cache)
+        if cache:
+            cache.save(head,resources=False)
+        return
+    t0= time.perf_counter()
+    iam_users, by_region, failed= scan(session,regions,MAX_WORKERS,cache)
+    wall= time.perf_counter() - t0
+
+    output_data= {
+        "account_id": account_id,
+        "user_arn": user_arn,
+        "regions": regions,
+        "scan_timestamp": time_now(),
+        "iam_users": iam_users,
+        "by_region": by_region,
+        "failed": sorted(list(f) for f in failed),
+        "scan_metrics": scan_metrics(wall)
+    }
+    if a.exposure:
+        proto= a.exposure_protocol or ("tcp" if ports is not None else None)
+        output_data["exposure"]= exposure(by_region,ports,proto)
+    if cache:
+        if a.diff:
+            output_data["previous_scan"]= cache.prev.get("scan_timestamp")
+            output_data["diff"]= scan_diff(cache.prev,output_data)
+        cache.save(output_data)
+    output_results(output_data,a.output,a.format)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
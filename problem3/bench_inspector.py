@@ -0,0 +1,227 @@
+import sys,os,json,time,datetime,argparse,threading,tracemalloc
+from collections import Counter
+import boto3
+from botocore.awsrequest import AWSResponse
+import aws_inspector as insp
+
+## offline benchmark: every AWS call is answered from a synthetic account through botocore's
+## before-call hook, so nothing leaves the machine and no credentials are needed
+
+BASE_DATE= datetime.datetime(2024,1,1,tzinfo=datetime.timezone.utc)
+
+def bench_args():
+    ap=argparse.ArgumentParser()
+    ap.add_argument('--users',type=int,default=200)
+    ap.add_argument('--instances',type=int,default=500,help="instances per region")
+    ap.add_argument('--buckets',type=int,default=50)
+    ap.add_argument('--objects',type=int,default=2000,help="objects per bucket")
+    ap.add_argument('--groups',type=int,default=300,help="security groups per region")
+    ap.add_argument('--rules',type=int,default=10,help="inbound rules per security group")
+    ap.add_argument('--regions',default='us-east-1,us-west-2')
+    ap.add_argument('--workers',type=int,default=insp.MAX_WORKERS)
+    ap.add_argument('--latency',type=float,default=0.0,help="simulated ms per API call")
+    ap.add_argument('--rate',type=float,default=0.0,help="keep the inspector's rate limiter on at this many requests per second (0 = off)")
+    ap.add_argument('--mode',default='scan',choices=['scan','jsonl'])
+    ap.add_argument('--save',default=None,help="write the report to this file")
+    ap.add_argument('--baseline',default=None,help="compare with a saved report, exit 1 if API calls grew")
+    return ap.parse_args()
+
+
+class FakeAccount:
+    # synthetic account; pages are sliced on demand so seeding stays cheap even for large counts
+    IAM_PAGE= 100
+    EC2_PAGE= 1000
+    S3_PAGE= 1000
+
+    def __init__(self,a,regions):
+        self.a= a
+        self.regions= regions
+        self.calls= Counter()
+        self.lock= threading.Lock()
+
+    def _page(self,total,token,size):
+        start= int(token) if token else 0
+        end= min(total,start+size)
+        return start, end, (str(end) if end < total else None)
+
+    def _user(self,i):
+        return {"UserName": f"user-{i:06d}", "UserId": f"AIDA{i:016d}", "Path": "/",
+                "Arn": f"arn:aws:iam::123456789012:user/user-{i:06d}", "CreateDate": BASE_DATE}
+
+    def list_users(self,region,p):
+        start,end,nxt= self._page(self.a.users,p.get("Marker"),self.IAM_PAGE)
+        out= {"Users": [self._user(i) for i in range(start,end)], "IsTruncated": nxt is not None}
+        if nxt:
+            out["Marker"]= nxt
+        return out
+
+    def get_user(self,region,p):
+        i= int(p["UserName"].split("-")[1])
+        return {"User": dict(self._user(i),PasswordLastUsed=BASE_DATE)}
+
+    def list_attached_user_policies(self,region,p):
+        return {"AttachedPolicies": [{"PolicyName": "ReadOnlyAccess", "PolicyArn": "arn:aws:iam::aws:policy/ReadOnlyAccess"}],
+                "IsTruncated": False}
+
+    def describe_instances(self,region,p):
+        start,end,nxt= self._page(self.a.instances,p.get("NextToken"),self.EC2_PAGE)
+        insts= []
+        for i in range(start,end):
+            insts.append({
+                "InstanceId": f"i-{region}-{i:08d}",
+                "InstanceType": "t3.micro",
+                "State": {"Name": "running" if i % 3 else "stopped"},
+                "PublicIpAddress": f"54.0.{i // 256 % 256}.{i % 256}",
+                "PrivateIpAddress": f"10.0.{i // 256 % 256}.{i % 256}",
+                "Placement": {"AvailabilityZone": f"{region}a"},
+                "LaunchTime": BASE_DATE,
+                "ImageId": f"ami-{i % 20:08d}",
+                "SecurityGroups": [{"GroupId": f"sg-{i % max(1,self.a.groups):08d}"}],
+                "Tags": [{"Key": "Name", "Value": f"bench-{i}"}]
+            })
+        out= {"Reservations": [{"Instances": insts}]}
+        if nxt:
+            out["NextToken"]= nxt
+        return out
+
+    def describe_images(self,region,p):
+        return {"Images": [{"ImageId": ami, "Name": f"image-{ami}"} for ami in p.get("ImageIds",[])]}
+
+    def describe_security_groups(self,region,p):
+        start,end,nxt= self._page(self.a.groups,p.get("NextToken"),self.EC2_PAGE)
+        sgs= []
+        for i in range(start,end):
+            perms= []
+            for j in range(self.a.rules):
+                port= 1024 + j * 10 if j else 22
+                perms.append({"IpProtocol": "tcp", "FromPort": port, "ToPort": port,
+                              "IpRanges": [{"CidrIp": "0.0.0.0/0" if j == 0 and i % 10 == 0 else f"10.{j}.0.0/16"}],
+                              "UserIdGroupPairs": [{"GroupId": f"sg-{(i + 1) % self.a.groups:08d}"}] if j == 1 else []})
+            sgs.append({"GroupId": f"sg-{i:08d}", "GroupName": f"bench-{i}", "Description": "bench",
+                        "VpcId": "vpc-00000001", "IpPermissions": perms,
+                        "IpPermissionsEgress": [{"IpProtocol": "-1", "IpRanges": [{"CidrIp": "0.0.0.0/0"}]}]})
+        out= {"SecurityGroups": sgs}
+        if nxt:
+            out["NextToken"]= nxt
+        return out
+
+    def list_buckets(self,region,p):
+        return {"Buckets": [{"Name": f"bench-bucket-{i:05d}", "CreationDate": BASE_DATE} for i in range(self.a.buckets)]}
+
+    def get_bucket_location(self,region,p):
+        i= int(p["Bucket"].rsplit("-",1)[1])
+        loc= self.regions[i % len(self.regions)]
+        return {"LocationConstraint": None if loc == "us-east-1" else loc}
+
+    def list_objects_v2(self,region,p):
+        start,end,nxt= self._page(self.a.objects,p.get("ContinuationToken"),self.S3_PAGE)
+        out= {"Contents": [{"Key": f"obj-{i:08d}", "Size": 1024 + i % 4096} for i in range(start,end)],
+              "IsTruncated": nxt is not None}
+        if nxt:
+            out["NextContinuationToken"]= nxt
+        return out
+
+    def params_hook(self,params=None,context=None,**kw):
+        if context is not None:
+            context["bench_params"]= dict(params or {})
+
+    def call_hook(self,model=None,context=None,**kw):
+        op= model.name
+        snake= "".join("_" + c.lower() if c.isupper() else c for c in op).lstrip("_")
+        with self.lock:
+            self.calls[op]+= 1
+        region= (context or {}).get("client_region")
+        # the fake answers before botocore sends anything, so pace here in place of the before-send hook
+        insp.rate_wait(model.service_model.endpoint_prefix,region)
+        if self.a.latency:
+            time.sleep(self.a.latency / 1000.0)
+        fn= getattr(self,snake,None)
+        if fn is None:
+            return (AWSResponse(None,400,{},None), {"Error": {"Code": "InvalidAction", "Message": op},
+                                                    "ResponseMetadata": {"HTTPStatusCode": 400}})
+        parsed= fn(region,(context or {}).get("bench_params",{}))
+        parsed["ResponseMetadata"]= {"HTTPStatusCode": 200, "RetryAttempts": 0}
+        return (AWSResponse(None,200,{},None), parsed)
+
+    def attach(self,session):
+        # clients copy the session's event handlers when created, so this covers every client
+        session.events.register("before-parameter-build", self.params_hook)
+        session.events.register("before-call", self.call_hook)
+
+
+def run(a):
+    regions= [r.strip() for r in a.regions.split(",") if r.strip()]
+    session= boto3.Session(region_name=regions[0],aws_access_key_id="bench",aws_secret_access_key="bench")
+    fake= FakeAccount(a,regions)
+    fake.attach(session)
+    insp.RATE_LIMIT= max(0.0,a.rate)
+
+    tracemalloc.start()
+    t0= time.perf_counter()
+    if a.mode == "jsonl":
+        head= {"account_id": "123456789012", "user_arn": "bench", "regions": regions, "scan_timestamp": insp.time_now()}
+        insp.write_jsonl(session,regions,head,os.devnull,a.workers)
+        counts= None
+    else:
+        iam_users, by_region, _= insp.scan(session,regions,a.workers)
+        counts= {"iam_users": len(iam_users)}
+        for svc in insp.REGIONAL:
+            counts[svc]= sum(len(res[svc]) for res in by_region.values())
+    wall= time.perf_counter() - t0
+    _, peak= tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "params": {k: v for k,v in vars(a).items() if k not in ["save","baseline"]},
+        "wall_seconds": round(wall,4),
+        "peak_memory_mb": round(peak / (1024.0 * 1024.0),2),
+        "api_calls": dict(sorted(fake.calls.items())),
+        "total_api_calls": sum(fake.calls.values()),
+        "resources": counts,
+        "collectors": insp.scan_metrics(wall)["collectors"]
+    }
+
+def report(res):
+    print(f"wall time:   {res['wall_seconds']:.3f} s")
+    print(f"peak memory: {res['peak_memory_mb']:.2f} MB")
+    print(f"api calls:   {res['total_api_calls']}")
+    if res["params"].get("rate"):
+        print(f"rate limit:  {res['params']['rate']:g} req/s per service and region")
+    for op,n in res["api_calls"].items():
+        print(f"  {op:<32}{n}")
+    print("collectors (seconds):")
+    for k,st in sorted(res["collectors"].items(), key=lambda kv: -kv[1]["seconds"]):
+        print(f"  {k:<32}{st['seconds']:.3f}")
+    if res["resources"]:
+        print("resources:")
+        for k,n in res["resources"].items():
+            print(f"  {k:<32}{n}")
+
+def compare(res,path):
+    try:
+        with open(path,"r") as f:
+            base= json.load(f)
+    except Exception as e:
+        insp.err(f"could not read baseline {path}: {e}")
+        return False
+    ok= True
+    print(f"vs baseline: wall {base['wall_seconds']:.3f}s -> {res['wall_seconds']:.3f}s, "
+          f"peak {base['peak_memory_mb']:.2f}MB -> {res['peak_memory_mb']:.2f}MB")
+    # call counts are deterministic for the same parameters, so any growth is a regression
+    for op in sorted(set(base["api_calls"]) | set(res["api_calls"])):
+        before= base["api_calls"].get(op,0)
+        after= res["api_calls"].get(op,0)
+        if after > before:
+            print(f"  [REGRESSION] {op}: {before} -> {after} calls")
+            ok= False
+    return ok
+
+
+if __name__ == "__main__":
+    a= bench_args()
+    res= run(a)
+    report(res)
+    if a.save:
+        with open(a.save,"w") as f:
+            json.dump(res,f,indent=2)
+    if a.baseline and not compare(res,a.baseline):
+        sys.exit(1)